@@ -27,6 +27,72 @@ enum cutoverState {
 }
 
 const TIME_TO_PREPARE_CUTOVER_IN_S = 5 * 60 * 1000;  // 5 minutes.
+const MAX_QUEUED_EVENTS = 200; // Beyond this, the oldest audio chunk is dropped.
+
+const textEncoder = new TextEncoder();
+const textDecoder = new TextDecoder();
+
+// Audio frames make up almost all of the input stream. Their fields are UUIDs
+// and base64, which never need JSON escaping, so they skip JSON.stringify.
+function encodeEvent(event: any): Uint8Array {
+  const audioInput = event.event?.audioInput;
+  if (audioInput) {
+    return textEncoder.encode(
+      `{"event":{"audioInput":{"promptName":"${audioInput.promptName}","contentName":"${audioInput.contentName}","content":"${audioInput.content}"}}}`
+    );
+  }
+  return textEncoder.encode(JSON.stringify(event));
+}
+
+// The contentStart / toolResult / contentEnd events that hand a tool's result
+// back to the model, in the order they must be sent.
+function buildToolResultEvents(
+  promptName: string,
+  toolUseId: string,
+  result: any
+): [any, any, any] {
+  const contentName = randomUUID();
+  const resultContent =
+    typeof result === "string" ? result : JSON.stringify(result);
+
+  return [
+    {
+      event: {
+        contentStart: {
+          promptName,
+          contentName,
+          interactive: false,
+          type: "TOOL",
+          role: "TOOL",
+          toolResultInputConfiguration: {
+            toolUseId: toolUseId,
+            type: "TEXT",
+            textInputConfiguration: {
+              mediaType: "text/plain",
+            },
+          },
+        },
+      },
+    },
+    {
+      event: {
+        toolResult: {
+          promptName,
+          contentName,
+          content: resultContent,
+        },
+      },
+    },
+    {
+      event: {
+        contentEnd: {
+          promptName,
+          contentName,
+        },
+      },
+    },
+  ];
+}
 
 export class Conversation {
   public id: string;
@@ -155,9 +221,6 @@ export class Conversation {
 }
 
 export class StreamSession {
-  public audioBufferQueue: Buffer[] = [];
-  public maxQueueSize = 200; // Maximum number of audio chunks to queue
-  public isProcessingAudio = false;
   public isActive = true;
   public startTime: number;
 
@@ -211,49 +274,8 @@ export class StreamSession {
   }
 
   public async streamAudio(audioData: Buffer): Promise<void> {
-    if (this.audioBufferQueue.length >= this.maxQueueSize) {
-      this.audioBufferQueue.shift();
-      console.log(
-        `Audio queue full (${this.audioBufferQueue.length} exceeds max size {this.maxQueueSize}), dropping oldest chunk`
-      );
-    }
-
-    this.audioBufferQueue.push(audioData);
-    this.processAudioQueue();
-  }
-
-  private async processAudioQueue() {
-    if (
-      this.isProcessingAudio ||
-      this.audioBufferQueue.length === 0 ||
-      !this.isActive
-    )
-      return;
-
-    this.isProcessingAudio = true;
-    try {
-      let processedChunks = 0;
-      const maxChunksPerBatch = 5;
-
-      while (
-        this.audioBufferQueue.length > 0 &&
-        processedChunks < maxChunksPerBatch &&
-        this.isActive
-      ) {
-        const audioChunk = this.audioBufferQueue.shift();
-        if (audioChunk) {
-          // console.log("219")
-          await this.client.streamAudioChunk(this.sessionId, audioChunk);
-          processedChunks++;
-        }
-      }
-    } finally {
-      this.isProcessingAudio = false;
-
-      if (this.audioBufferQueue.length > 0 && this.isActive) {
-        setTimeout(() => this.processAudioQueue(), 0);
-      }
-    }
+    if (!this.isActive) return;
+    await this.client.streamAudioChunk(this.sessionId, audioData);
   }
 
   public async endAudioContent(): Promise<void> {
@@ -270,7 +292,6 @@ export class StreamSession {
     if (!this.isActive) return;
 
     this.isActive = false;
-    this.audioBufferQueue = [];
 
     await this.client.sendSessionEnd(this.sessionId);
     console.log(`Session ${this.sessionId} close completed`);
@@ -287,6 +308,17 @@ export class NovaSonicBidirectionalStreamClient {
   public contentNames: Map<string, string> = new Map();
 
   constructor(config: NovaSonicBidirectionalStreamClientConfig) {
+    this.inferenceConfig = config.inferenceConfig ?? {
+      maxTokens: 1024,
+      topP: 0.9,
+      temperature: 0.7,
+    };
+
+    if (config.bedrockRuntimeClient) {
+      this.bedrockRuntimeClient = config.bedrockRuntimeClient;
+      return;
+    }
+
     const nodeHttp2Handler = new NodeHttp2Handler({
       requestTimeout: 300000,
       sessionTimeout: 300000,
@@ -295,7 +327,7 @@ export class NovaSonicBidirectionalStreamClient {
       ...config.requestHandlerConfig,
     });
 
-    if (!config.clientConfig.credentials) {
+    if (!config.clientConfig?.credentials) {
       throw new Error("No credentials provided");
     }
 
@@ -305,12 +337,6 @@ export class NovaSonicBidirectionalStreamClient {
       region: config.clientConfig.region || "us-east-1",
       requestHandler: nodeHttp2Handler,
     });
-
-    this.inferenceConfig = config.inferenceConfig ?? {
-      maxTokens: 1024,
-      topP: 0.9,
-      temperature: 0.7,
-    };
   }
 
   public setupHistoryEventForConversationResumption(
@@ -408,6 +434,7 @@ export class NovaSonicBidirectionalStreamClient {
       isActive: true,
       isPromptStartSent: false,
       isAudioContentStartSent: false,
+      droppedAudioChunks: 0,
       audioContentId: randomUUID(),
     };
 
@@ -566,7 +593,7 @@ export class NovaSonicBidirectionalStreamClient {
               return {
                 value: {
                   chunk: {
-                    bytes: new TextEncoder().encode(JSON.stringify(nextEvent)),
+                    bytes: encodeEvent(nextEvent),
                   },
                 },
                 done: false,
@@ -618,6 +645,35 @@ export class NovaSonicBidirectionalStreamClient {
     }
   }
 
+  private async runTool(
+    ws: WebSocket,
+    sessionId: string,
+    toolName: string,
+    toolUseId: string,
+    toolUseContent: object
+  ): Promise<void> {
+    console.log("Calling tool with content:", toolUseContent);
+    try {
+      const toolResult = await this.processToolUse(
+        ws,
+        toolName,
+        toolUseContent
+      );
+
+      this.sendToolResult(sessionId, toolUseId, toolResult);
+
+      this.dispatchEvent(sessionId, "toolResult", {
+        toolUseId,
+        result: toolResult,
+      });
+    } catch (error) {
+      console.error(
+        `Error processing tool use for session ${sessionId}: `,
+        error
+      );
+    }
+  }
+
   private async processResponseStream(
     ws: WebSocket,
     conversation: Conversation,
@@ -638,44 +694,37 @@ export class NovaSonicBidirectionalStreamClient {
         if (event.chunk?.bytes) {
           try {
             this.updateSessionActivity(sessionId);
-            const textResponse = new TextDecoder().decode(event.chunk.bytes);
+            const textResponse = textDecoder.decode(event.chunk.bytes);
 
             try {
               const jsonResponse = JSON.parse(textResponse);
-              console.log(574)
-              if (jsonResponse.event?.contentStart) {
+              const responseEvent = jsonResponse.event;
+              if (responseEvent?.contentStart) {
                 this.dispatchEvent(
                   sessionId,
                   "contentStart",
-                  jsonResponse.event.contentStart
+                  responseEvent.contentStart
                 );
-              } else if (jsonResponse.event?.textOutput) {
+              } else if (responseEvent?.textOutput) {
                 this.dispatchEvent(
                   sessionId,
                   "textOutput",
-                  jsonResponse.event.textOutput
+                  responseEvent.textOutput
                 );
-              } else if (jsonResponse.event?.audioOutput) {
-                console.log(589)
+              } else if (responseEvent?.audioOutput) {
                 this.dispatchEvent(
                   sessionId,
                   "audioOutput",
-                  jsonResponse.event.audioOutput
-                );
-              } else if (jsonResponse.event?.toolUse) {
-                this.dispatchEvent(
-                  sessionId,
-                  "toolUse",
-                  jsonResponse.event.toolUse
+                  responseEvent.audioOutput
                 );
-
-                session.toolUseContent = jsonResponse.event.toolUse;
-                session.toolUseId = jsonResponse.event.toolUse.toolUseId;
-                session.toolName = jsonResponse.event.toolUse.toolName;
-              } else if (
-                jsonResponse.event?.contentEnd &&
-                jsonResponse.event?.contentEnd?.type === "TOOL"
-              ) {
+              } else if (responseEvent?.toolUse) {
+                const toolUse = responseEvent.toolUse;
+                this.dispatchEvent(sessionId, "toolUse", toolUse);
+
+                session.toolUseContent = toolUse;
+                session.toolUseId = toolUse.toolUseId;
+                session.toolName = toolUse.toolName;
+              } else if (responseEvent?.contentEnd?.type === "TOOL") {
                 console.log(`Processing tool use for session ${sessionId}`);
                 this.dispatchEvent(sessionId, "toolEnd", {
                   toolUseContent: session.toolUseContent,
@@ -683,37 +732,30 @@ export class NovaSonicBidirectionalStreamClient {
                   toolName: session.toolName,
                 });
 
-                console.log(
-                  "Calling tool with content:",
-                  session.toolUseContent
-                );
-                const toolResult = await this.processToolUse(
+                // Run the tool without awaiting it, so a slow tool doesn't stop
+                // this loop from reading the rest of the response stream.
+                this.runTool(
                   ws,
+                  sessionId,
                   session.toolName,
+                  session.toolUseId,
                   session.toolUseContent
                 );
-
-                this.sendToolResult(sessionId, session.toolUseId, toolResult);
-
-                this.dispatchEvent(sessionId, "toolResult", {
-                  toolUseId: session.toolUseId,
-                  result: toolResult,
-                });
-              } else if (jsonResponse.event?.contentEnd) {
+              } else if (responseEvent?.contentEnd) {
                 this.dispatchEvent(
                   sessionId,
                   "contentEnd",
-                  jsonResponse.event.contentEnd
+                  responseEvent.contentEnd
                 );
               } else {
-                const eventKeys = Object.keys(jsonResponse.event || {});
+                const eventKeys = Object.keys(responseEvent || {});
                 console.log(`Event keys for session ${sessionId}: `, eventKeys);
                 console.log(`Handling other events`);
                 if (eventKeys.length > 0) {
                   this.dispatchEvent(
                     sessionId,
                     eventKeys[0],
-                    jsonResponse.event
+                    responseEvent
                   );
                 } else if (Object.keys(jsonResponse).length > 0) {
                   this.dispatchEvent(sessionId, "unknown", jsonResponse);
@@ -783,13 +825,22 @@ export class NovaSonicBidirectionalStreamClient {
       }
     }
 
-    console.log(`pushing event to ${sessionId}`);
     this.updateSessionActivity(sessionId);
-    // console.log(716, session == null)
     session.queue.push(event);
     session.queueSignal.next();
   }
 
+  // Enqueues events that always go out back to back, waking the input stream
+  // once for the whole batch instead of once per event.
+  addEventsToSessionQueue(sessionId: string, events: any[]): void {
+    const session = this.activeSessions.get(sessionId);
+    if (!session || !session.isActive) return;
+
+    this.updateSessionActivity(sessionId);
+    session.queue.push(...events);
+    session.queueSignal.next();
+  }
+
   private setupSessionStartEvent(sessionId: string): void {
     console.log(`Setting up initial events for session ${sessionId}...`);
     const session = this.activeSessions.get(sessionId);
@@ -909,7 +960,32 @@ export class NovaSonicBidirectionalStreamClient {
     }
     const base64Data = audioData.toString("base64");
 
-    // console.log("838")
+    if (session.queue.length >= MAX_QUEUED_EVENTS) {
+      const oldestAudio = session.queue.findIndex(
+        (queued) => queued.event?.audioInput
+      );
+      if (oldestAudio !== -1) {
+        session.queue.splice(oldestAudio, 1);
+        // Log when dropping starts, not for every dropped frame.
+        if (session.droppedAudioChunks === 0) {
+          console.log(
+            `Event queue for session ${sessionId} reached max size ${MAX_QUEUED_EVENTS}, dropping oldest audio chunks`
+          );
+        }
+        session.droppedAudioChunks++;
+      }
+    } else if (
+      session.droppedAudioChunks > 0 &&
+      session.queue.length <= MAX_QUEUED_EVENTS / 2
+    ) {
+      // Only end the episode once the queue is well below the limit, so a
+      // queue hovering at the limit doesn't log on every event consumed.
+      console.log(
+        `Event queue for session ${sessionId} drained, dropped ${session.droppedAudioChunks} audio chunks`
+      );
+      session.droppedAudioChunks = 0;
+    }
+
     this.addEventToSessionQueue(sessionId, {
       event: {
         audioInput: {
@@ -932,47 +1008,10 @@ export class NovaSonicBidirectionalStreamClient {
     console.log(
       `Sending tool result for session ${sessionId}, tool use ID: ${toolUseId}`
     );
-    const contentName = randomUUID();
-
-    this.addEventToSessionQueue(sessionId, {
-      event: {
-        contentStart: {
-          promptName: session.promptName,
-          contentName,
-          interactive: false,
-          type: "TOOL",
-          role: "TOOL",
-          toolResultInputConfiguration: {
-            toolUseId: toolUseId,
-            type: "TEXT",
-            textInputConfiguration: {
-              mediaType: "text/plain",
-            },
-          },
-        },
-      },
-    });
-
-    const resultContent =
-      typeof result === "string" ? result : JSON.stringify(result);
-    this.addEventToSessionQueue(sessionId, {
-      event: {
-        toolResult: {
-          promptName: session.promptName,
-          contentName,
-          content: resultContent,
-        },
-      },
-    });
-
-    this.addEventToSessionQueue(sessionId, {
-      event: {
-        contentEnd: {
-          promptName: session.promptName,
-          contentName: contentName,
-        },
-      },
-    });
+    this.addEventsToSessionQueue(
+      sessionId,
+      buildToolResultEvents(session.promptName, toolUseId, result)
+    );
 
     console.log(`Tool result sent for session ${sessionId}`);
   }
@@ -1028,14 +1067,11 @@ export class NovaSonicBidirectionalStreamClient {
   }
 
   dispatchEvent(sessionId: string, eventType: string, data: any): void {
-    console.log(960)
     const session = this.activeSessions.get(sessionId);
     if (!session) return;
 
-    console.log(964, session.responseHandlers)
     const handler = session.responseHandlers.get(eventType);
     if (handler) {
-      console.log(966)
       try {
         handler(data);
       } catch (e) {
@@ -1,54 +1,78 @@
 import * as aws from "aws-sdk";
+import { OutputData, Result } from "./types";
 
-const bedrockAgent = new aws.BedrockAgentRuntime({
-  accessKeyId: process.env.AWS_ACCESS_KEY_ID!,
-  secretAccessKey: process.env.AWS_SECRET_ACCESS_KEY!,
-});
+// Read once when the module loads. Whoever imports this module must have loaded
+// dotenv first (server.ts does, but does not import kb.ts today).
+const AWS_ACCESS_KEY_ID = process.env.AWS_ACCESS_KEY_ID!;
+const AWS_SECRET_ACCESS_KEY = process.env.AWS_SECRET_ACCESS_KEY!;
+const KNOWLEDGE_BASE_ID = process.env.KNOWLEDGE_BASE_ID;
 
-function queryKb(kbId: string, query: string): OutputData | number {
-  const knowledgeBaseId = getKnowledgeBaseId();
-  try {
-    const response = bedrockAgent
-      .retrieve({
-        knowledgeBaseId: knowledgeBaseId,
-        retrievalQuery: {
-          text: query,
-        },
-        retrievalConfiguration: {
-          vectorSearchConfiguration: {
-            numberOfResults: 5,
-          },
-        },
-      })
-      .promise();
+// Built lazily on first lookup and reused afterwards, so client setup (service
+// model, credentials) is paid once. Note that nothing imports this module yet:
+// no knowledge base tool is registered in ToolRegistry.
+let bedrockAgent: aws.BedrockAgentRuntime | null = null;
 
-    const results: Result[] = [];
+function getBedrockAgentClient(): aws.BedrockAgentRuntime {
+  if (!bedrockAgent) {
+    bedrockAgent = new aws.BedrockAgentRuntime({
+      accessKeyId: AWS_ACCESS_KEY_ID,
+      secretAccessKey: AWS_SECRET_ACCESS_KEY,
+    });
+  }
+  return bedrockAgent;
+}
 
-    response.then((data) => {
-      for (const item of data.retrievalResults || []) {
-        const result: Result = {
-          content: item.content?.text || "",
-          location: item.location?.s3Location?.uri || "",
-          score: item.score || 0.0,
-        };
+function retrieve(
+  knowledgeBaseId: string,
+  query: string
+): Promise<aws.BedrockAgentRuntime.RetrieveResponse> {
+  return getBedrockAgentClient()
+    .retrieve({
+      knowledgeBaseId: knowledgeBaseId,
+      retrievalQuery: {
+        text: query,
+      },
+      retrievalConfiguration: {
+        vectorSearchConfiguration: {
+          numberOfResults: 5,
+        },
+      },
+    })
+    .promise();
+}
 
-        if (item.metadata) {
-          result.metadata = item.metadata;
-        }
+async function queryKb(
+  kbId: string,
+  query: string
+): Promise<OutputData | null> {
+  const knowledgeBaseId = kbId || KNOWLEDGE_BASE_ID;
+  if (!knowledgeBaseId) {
+    throw new Error("No knowledge base ID provided");
+  }
 
-        results.push(result);
-      }
+  try {
+    const data = await retrieve(knowledgeBaseId, query);
 
-      const output: OutputData = {
-        query: query,
-        results: results,
-        result_count: results.length,
+    const results: Result[] = [];
+    for (const item of data.retrievalResults || []) {
+      const result: Result = {
+        content: item.content?.text || "",
+        location: item.location?.s3Location?.uri || "",
+        score: item.score || 0.0,
       };
 
-      return output;
-    });
+      if (item.metadata) {
+        result.metadata = item.metadata;
+      }
 
-    return null;
+      results.push(result);
+    }
+
+    return {
+      query: query,
+      results: results,
+      result_count: results.length,
+    };
   } catch (e) {
     console.error(`Error querying knowledge base: ${e}`);
     return null;
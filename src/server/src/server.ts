@@ -14,7 +14,14 @@ import { fromEnv } from "@aws-sdk/credential-providers";
 import { v4 as uuidv4 } from "uuid";
 
 const app = express();
-const wsInstance = expressWs(app);
+const wsInstance = expressWs(app, undefined, {
+  wsOptions: {
+    // Audio frames are base64/PCM and barely compress, so deflate would only
+    // cost CPU and per-connection zlib memory.
+    perMessageDeflate: false,
+    maxPayload: 1024 * 1024, // 1 MiB; inbound messages are small audio frames.
+  },
+});
 app.use(bodyParser.json());
 
 const bedrockClient = new NovaSonicBidirectionalStreamClient({
@@ -96,6 +103,9 @@ function canCut(callState: CallState) {
   return callState == CallState.SONIC_IS_DOING_FINAL_TEXT_OUTPUT;
 }
 
+// About two seconds of 16kHz 16-bit mono audio.
+const MAX_BUFFERED_AUDIO_BYTES = 64 * 1024;
+
 export function setUpEventHandlersForChannel(conversation: Conversation) {
   console.log("conversation", conversation);
   function handleConversationEvent(
@@ -143,7 +153,7 @@ export function setUpEventHandlersForChannel(conversation: Conversation) {
 
       // Broadcast to all clients in this channel
       const clients = channelClients.get(conversation.id) || new Set();
-      const message = JSON.stringify({ event: { [eventName]: { ...data } } });
+      const message = JSON.stringify({ event: { [eventName]: data } });
 
       clients.forEach((client) => {
         if (client.readyState === WebSocket.OPEN) {
@@ -176,6 +186,16 @@ export function setUpEventHandlersForChannel(conversation: Conversation) {
 
     const clients = channelClients.get(conversation.id) || new Set();
 
+    // Peers that have fallen too far behind skip this audio rather than letting
+    // their send buffer (and our memory) grow without bound. This applies to
+    // every audio format below.
+    const openClients = [...clients].filter(
+      (client) =>
+        client.readyState === WebSocket.OPEN &&
+        client.bufferedAmount < MAX_BUFFERED_AUDIO_BYTES
+    );
+    if (openClients.length === 0) return;
+
     const buffer = Buffer.from(data["content"], "base64");
     const pcmSamples = new Int16Array(
       buffer.buffer,
@@ -183,26 +203,49 @@ export function setUpEventHandlersForChannel(conversation: Conversation) {
       buffer.length / Int16Array.BYTES_PER_ELEMENT
     );
 
+    // Default way to send audio samples to the websocket clients. Frames stay
+    // at CHUNK_SIZE_BYTES (telephony peers expect fixed-size frames), but are
+    // sent as views into the decoded buffer rather than per-frame copies.
     let offset = 0;
-    // Default way to send audio samples to the websocket clients.
     while (offset + SAMPLES_PER_CHUNK <= pcmSamples.length) {
-      const chunk = pcmSamples.slice(offset, offset + SAMPLES_PER_CHUNK);
-      clients?.forEach((client) => {
-        if (client.readyState === WebSocket.OPEN) client.send(chunk);
-      });
+      const chunk = pcmSamples.subarray(offset, offset + SAMPLES_PER_CHUNK);
+      for (const client of openClients) client.send(chunk);
       offset += SAMPLES_PER_CHUNK;
     }
     // Twilio takes a different format for audio samples.
     if (twilio.isOn)
       twilio.tryProcessAudioOutput(
         pcmSamples,
-        clients,
+        openClients,
         conversation.twilioStreamSid!
       );
-    if (browser.isOn) browser.tryProcessAudioOutput(data, clients);
+    if (browser.isOn) browser.tryProcessAudioOutput(data, openClients);
   });
 }
 
+// Handlers for Nova Sonic control messages, built once rather than per message.
+const handlePromptStart = async (jsonMsg, conversation) =>
+  await conversation.setupPromptStart();
+const handleSystemPrompt = async (jsonMsg, conversation) =>
+  await conversation.setupSystemPrompt(undefined, jsonMsg.data);
+const handleAudioStart = async (jsonMsg, conversation) =>
+  await conversation.setupStartAudio();
+const handleStopAudio = async (jsonMsg, conversation) => {
+  await conversation.endAudioContent();
+  await conversation.endPrompt();
+};
+
+// Map of [ messageTag -> handlerFunction ]
+const novaSonicHandlers = new Map<
+  string,
+  (jsonMsg: any, conversation: Conversation) => Promise<void>
+>([
+  ["promptStart", handlePromptStart],
+  ["systemPrompt", handleSystemPrompt],
+  ["audioStart", handleAudioStart],
+  ["stopAudio", handleStopAudio],
+]);
+
 wsInstance.app.ws("/socket", (ws: WebSocket, req: Request) => {
   // Get channel from query parameters or use a default
   const conversationId = req.query.channel?.toString() || uuidv4();
@@ -214,7 +257,7 @@ wsInstance.app.ws("/socket", (ws: WebSocket, req: Request) => {
       data: { message, details },
     });
     console.log(`Sending error ${errorMsg}`);
-    ws.send(JSON.stringify({ event: "error", data: { message, details } }));
+    ws.send(errorMsg);
   };
 
   async function tryProcessNovaSonicMessage(
@@ -224,31 +267,8 @@ wsInstance.app.ws("/socket", (ws: WebSocket, req: Request) => {
     try {
       const jsonMsg = JSON.parse(msg.toString());
 
-      // Create handler functions.
-      const handlePromptStart = async (jsonMsg, conversation) =>
-        await conversation.setupPromptStart();
-      const handleSystemPrompt = async (jsonMsg, conversation) =>
-        await conversation.setupSystemPrompt(undefined, jsonMsg.data);
-      const handleAudioStart = async (jsonMsg, conversation) =>
-        await conversation.setupStartAudio();
-      const handleStopAudio = async (jsonMsg, conversation) => {
-        await conversation.endAudioContent();
-        await conversation.endPrompt();
-      };
-
-      // Create map of [ messageTag -> handlerFunction ]
-      let novaSonicHandlers = new Map<
-        string,
-        (jsonMsg: any, conversation: Conversation) => Promise<void>
-      >([
-        ["promptStart", handlePromptStart],
-        ["systemPrompt", handleSystemPrompt],
-        ["audioStart", handleAudioStart],
-        ["stopAudio", handleStopAudio],
-      ]);
-
       // Try use JSON messages with `.event` prop.
-      let handler = novaSonicHandlers.get(jsonMsg.type);
+      const handler = novaSonicHandlers.get(jsonMsg.type);
       if (handler) await handler(jsonMsg, conversation);
     } catch (e) {}
   }
@@ -4,6 +4,9 @@ import { Request, Response } from "express";
 import { Conversation } from "../client";
 import { mulaw } from "alawmulaw";
 
+// If you have a SIP endpoint for failover
+const SIP_ENDPOINT = process.env.SIP_ENDPOINT || "";
+
 export class TwilioIntegration {
   isOn: boolean;
 
@@ -37,14 +40,12 @@ export class TwilioIntegration {
   }
 
   private handleFailover(req: Request, res: Response): void {
-    // If you have a SIP endpoint for failover
-    const sipEndpoint = process.env.SIP_ENDPOINT || "";
     const sipTwiml = `
       <Response>
         <Say>Hang on for a moment while I forward the call to a human agent</Say>
         <Pause length="1"/>
         <Dial>
-          <Sip>${sipEndpoint}</Sip>
+          <Sip>${SIP_ENDPOINT}</Sip>
         </Dial>
       </Response>`;
 
@@ -110,8 +111,6 @@ export class TwilioIntegration {
         },
         streamSid
       });
-      console.log("response", response)
-
       clients?.forEach((client) => {
         if (client.readyState === WebSocket.OPEN) client.send(response);
       });
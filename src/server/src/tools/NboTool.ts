@@ -1,4 +1,4 @@
-import { Tool } from "./Tool";
+import { Tool, normalizePhoneNumber } from "./Tool";
 
 const sampleData = {
   phone_number: {
@@ -36,6 +36,16 @@ const sampleData = {
   },
 };
 
+// The sample data is keyed on a 10-digit US number without a country code, so
+// accept its "1"-prefixed form too (e.g. from "+1 ..." input).
+const samplePhoneNumbers = new Set([
+  sampleData.phone_number.S,
+  `1${sampleData.phone_number.S}`,
+]);
+
+// Note: this tool is not registered in ToolRegistry yet (only the XML tools
+// are), and its execute() signature doesn't match the registry's
+// (client, ws, content, messagesList) call, so nothing invokes it today.
 export class NboTool extends Tool {
   public static id = "nbotool";
   public static schema = {
@@ -66,7 +76,12 @@ export class NboTool extends Tool {
   public static async execute(toolUseContent, messagesList: string[]): Promise<any> {
     const { phoneNumber, intentType } = JSON.parse(toolUseContent.content);
 
-    if (phoneNumber != "5101234567") return {};
+    const cleanNumber = normalizePhoneNumber(phoneNumber);
+
+    if (!cleanNumber) {
+      return { error: `Invalid phone number: ${phoneNumber}` };
+    }
+    if (!samplePhoneNumbers.has(cleanNumber)) return {};
     const item = sampleData[intentType];
 
     if (!item) {
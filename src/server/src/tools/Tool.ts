@@ -7,6 +7,15 @@ export const DefaultToolSchema = {
   required: [],
 };
 
+const PHONE_NUMBER_SEPARATORS = /[-() +.]/g;
+
+// Strips common separators and returns the bare digits, or null if what's left
+// isn't a plausible (E.164-length) phone number. Country codes are kept as is.
+export function normalizePhoneNumber(phoneNumber: unknown): string | null {
+  const digits = String(phoneNumber).replace(PHONE_NUMBER_SEPARATORS, "");
+  return /^\d{8,15}$/.test(digits) ? digits : null;
+}
+
 export abstract class Tool {
   public static id: string;
   public static schema: {
@@ -3,6 +3,7 @@ import { DOMParser } from "xmldom";
 import { synthesizeSpeech } from "../tts";
 import { NovaSonicBidirectionalStreamClient } from "../client";
 import { WebSocket } from "ws";
+import { Buffer } from "node:buffer";
 
 function startAudioContent(
   ws: WebSocket,
@@ -71,17 +72,15 @@ async function triggerSonic(
 
     for (let i = 0; i < audioBytes.length; i += chunkSize) {
       const end = Math.min(i + chunkSize, audioBytes.length);
-      const chunk = audioBytes.slice(i, end);
-      const pcmData = new Int16Array(chunk.length / 2);
-      for (let j = 0; j < chunk.length; j += 2) {
-        pcmData[j / 2] = (chunk[j + 1] << 8) | chunk[j];
-      }
-      const base64Data = btoa(
-        String.fromCharCode.apply(null, new Uint8Array(pcmData.buffer))
-      );
-
-      for (let i = 0; i < audioBytes.length; i += chunkSize) {
-        const event = {
+      // The synthesized audio is already 16-bit little-endian PCM, so the
+      // chunk can be base64-encoded as is.
+      const base64Data = Buffer.from(
+        audioBytes.buffer,
+        audioBytes.byteOffset + i,
+        end - i
+      ).toString("base64");
+      ws.send(
+        JSON.stringify({
           event: {
             audioInput: {
               role: "USER",
@@ -90,9 +89,8 @@ async function triggerSonic(
               content: base64Data,
             },
           },
-        };
-        ws.send(JSON.stringify(event));
-      }
+        })
+      );
     }
     setTimeout(() => {
       endAudioContent(ws, promptName, contentName);
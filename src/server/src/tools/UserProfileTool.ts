@@ -1,4 +1,4 @@
-import { Tool } from "./Tool";
+import { Tool, normalizePhoneNumber } from "./Tool";
 
 const sampleData = [
   {
@@ -35,6 +35,39 @@ const sampleData = [
   },
 ];
 
+// Unmarshals only the attributes the tool returns. Done once per profile when
+// the module loads, rather than on every lookup.
+function toProfile(item: (typeof sampleData)[number]) {
+  return {
+    phone_number: item.phone_number.S,
+    account_number: item.account_number.S,
+    current_bill: item.current_bill.S,
+    customer_since: item.customer_since.S,
+    data_used: item.data_used.S,
+    device: item.device.S,
+    has_international_fees: item.has_international_fees.S === "true",
+    international_roaming_fees: item.international_roaming_fees.S,
+    plan: item.plan.S,
+    plan_cost: item.plan_cost.S,
+  };
+}
+
+// Profiles indexed by phone number, so each lookup is a single map hit. The
+// sample data is keyed on 10-digit US numbers without a country code, so each
+// profile is also indexed under its "1"-prefixed form to match "+1 ..." input.
+const profilesByPhoneNumber = new Map<string, ReturnType<typeof toProfile>>(
+  sampleData.flatMap((item) => {
+    const profile = toProfile(item);
+    return [
+      [item.phone_number.S, profile],
+      [`1${item.phone_number.S}`, profile],
+    ] as [string, ReturnType<typeof toProfile>][];
+  })
+);
+
+// Note: this tool is not registered in ToolRegistry yet (only the XML tools
+// are), and its execute() signature doesn't match the registry's
+// (client, ws, content, messagesList) call, so nothing invokes it today.
 export class UserProfileTool extends Tool {
   public static id = "userprofiletool";
   public static schema = {
@@ -59,23 +92,14 @@ export class UserProfileTool extends Tool {
   };
 
   public static async execute(toolUseContent, messagesList: string[]): Promise<any> {
-    const phoneNumber: string = JSON.parse(toolUseContent.content);
+    const { phoneNumber } = JSON.parse(toolUseContent.content);
+    const cleanNumber = normalizePhoneNumber(phoneNumber);
 
-    if (phoneNumber != "5101234567") return {};
-    const item = sampleData[0];
+    if (!cleanNumber) {
+      return { error: `Invalid phone number: ${phoneNumber}` };
+    }
 
-    return {
-      phone_number: item.phone_number.S,
-      account_number: item.account_number.S,
-      current_bill: item.current_bill.S,
-      customer_since: item.customer_since.S,
-      data_used: item.data_used.S,
-      device: item.device.S,
-      has_international_fees: item.has_international_fees.S === "true",
-      international_roaming_fees: item.international_roaming_fees.S,
-      plan: item.plan.S,
-      plan_cost: item.plan_cost.S,
-    };
+    return profilesByPhoneNumber.get(cleanNumber) ?? {};
   }
 }
 
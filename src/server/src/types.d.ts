@@ -94,6 +94,7 @@ interface SessionData {
   isActive: boolean;
   isPromptStartSent: boolean;
   isAudioContentStartSent: boolean;
+  droppedAudioChunks: number;
   audioContentId: string;
 }
 
@@ -101,7 +102,10 @@ interface NovaSonicBidirectionalStreamClientConfig {
   requestHandlerConfig?:
     | NodeHttp2HandlerOptions
     | Provider<NodeHttp2HandlerOptions | void>;
-  clientConfig: Partial<BedrockRuntimeClientConfig>;
+  clientConfig?: Partial<BedrockRuntimeClientConfig>;
   inferenceConfig?: InferenceConfig;
+  // Reuse an existing client (and its HTTP/2 connection pool) instead of
+  // building one; requestHandlerConfig and clientConfig are then ignored.
+  bedrockRuntimeClient?: BedrockRuntimeClient;
 }
 